@@ -1,145 +1,427 @@
 import argparse
+import asyncio
 import sys
-import copy
-import re
-import csv
 import time
-
-import requests
-from veracode_api_signing.plugin_requests import RequestsAuthPluginVeracodeHMAC
+import csv
+import hashlib
+import hmac
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import httpx
+import orjson
+from veracode_api_signing.credentials import get_credentials
+from veracode_api_signing.formatters import format_signing_data, format_veracode_hmac_header
+from veracode_api_signing.regions import remove_prefix_from_api_credential
+from veracode_api_signing.utils import generate_nonce, get_current_timestamp
+from veracode_api_signing.validation import validate_api_key_id, validate_api_key_secret
 
 API_HOST = "https://api.veracode.com"
 APPS_URL = f"{API_HOST}/appsec/v1/applications"
 BU_URL = f"{API_HOST}/api/authn/v2/business_units"
-PAGE_SIZE = 500
+# undocumented bulk create endpoint; leave off until confirmed for the tenant
+BU_BULK_URL = f"{BU_URL}/bulk"
+BU_BULK_CREATE = False
+PAGE_SIZE = 500  # server-side maximum for the applications API
+# identity API page size; not documented as its max, kept at the value
+# the script has always used for this endpoint
+BU_PAGE_SIZE = 500
 DEFAULT_CSV = "dry_run_bu_assignments.csv"
+CSV_BUFFER = 1 << 20
+# column order of the positional rows built in _process_one
+CSV_FIELDS = [
+    "app_name",
+    "app_guid",
+    "bu_name",
+    "current_bu_guid",
+    "target_bu_guid",
+    "bu_action",
+    "app_action",
+]
+
+BU_CACHE = Path.home() / ".cache" / "bu-app-mapper" / "bu_map.json"
+BU_CACHE_TTL = 24 * 60 * 60
+ETAG_CACHE = BU_CACHE.with_name("app_etags.json")
 
 MAX_RETRIES = 3
+RETRY_STATUSES = frozenset([429, 502, 503, 504])
+POST_RETRY_STATUSES = frozenset([429, 503])
+RETRY_BACKOFF = 0.5
 REQUEST_TIMEOUT = 30
+MAX_CONCURRENCY = 32
+POOL_SIZE = 32
+
+
+class VeracodeHMACAuth(httpx.Auth):
+    # httpx port of RequestsAuthPluginVeracodeHMAC (sync and async clients).
+    # the first HMAC stage is keyed by the secret alone, so it is seeded
+    # once here and .copy()'d per request instead of re-keyed; formatting,
+    # prefix handling and validation reuse the upstream helpers
+
+    scheme = "VERACODE-HMAC-SHA-256"
+
+    def __init__(self):
+        self.api_key_id, api_key_secret = get_credentials()
+        validate_api_key_id(self.api_key_id)
+        validate_api_key_secret(api_key_secret)
+        secret = bytes.fromhex(remove_prefix_from_api_credential(api_key_secret))
+        self._secret_hmac = hmac.new(secret, digestmod=hashlib.sha256)
+
+    def sign(self, host, path, method):
+        # same derivation as veracode_hmac_auth.create_hmac_sha_256_signature
+        timestamp = get_current_timestamp()
+        nonce = generate_nonce()
+
+        key_nonce = self._secret_hmac.copy()
+        key_nonce.update(bytes.fromhex(nonce))
+        key_date = hmac.new(key_nonce.digest(), str(timestamp).encode(), hashlib.sha256).digest()
+        signing_key = hmac.new(key_date, b"vcode_request_version_1", hashlib.sha256).digest()
+
+        data = format_signing_data(self.api_key_id, host, path, method)
+        signature = hmac.new(signing_key, data.encode(), hashlib.sha256).hexdigest()
+        return format_veracode_hmac_header(self.scheme, self.api_key_id, timestamp, nonce, signature)
+
+    def auth_flow(self, request):
+        url = urlsplit(str(request.url))
+        path = url.path + (f"?{url.query}" if url.query else "")
+        request.headers["Authorization"] = self.sign(url.hostname, path, request.method)
+        yield request
+
+
+def build_client():
+    # async HTTP/2 client w/ HMAC signing for all calls; concurrent requests
+    # are multiplexed over a single TLS connection. limits/http2 go on the
+    # transport since httpx ignores the client-level ones when one is passed
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=POOL_SIZE,
+            max_keepalive_connections=POOL_SIZE,
+        ),
+    )
+    return httpx.AsyncClient(
+        auth=VeracodeHMACAuth(),
+        timeout=REQUEST_TIMEOUT,
+        transport=transport,
+    )
 
 
-def build_session():
-    # session w/ HMAC signing for all calls
-    s = requests.Session()
-    s.auth = RequestsAuthPluginVeracodeHMAC()
-    return s
+async def send_request(client, method, url, **kwargs):
+    # back off on throttling / gateway errors and dropped connections; this
+    # is the only retry layer, the transport does not retry. POST is only
+    # retried when the server cannot have acted on it, since a gateway
+    # timeout or read error may follow a create that succeeded
+    idempotent = method != "POST"
+    statuses = RETRY_STATUSES if idempotent else POST_RETRY_STATUSES
 
+    for attempt in range(MAX_RETRIES + 1):
+        last = attempt == MAX_RETRIES
+        try:
+            r = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            unsent = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+            if last or not (idempotent or unsent):
+                raise
+            print(f"[WARN] request failed on {url} (attempt {attempt + 1}): {e!r}")
+        else:
+            if r.status_code not in statuses or last:
+                return r
+            print(f"[WARN] {r.status_code} on {url} (attempt {attempt + 1})")
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
 
-def send_request(session, method, url, **kwargs):
-    # simple retry logic
-    if "timeout" not in kwargs:
-        kwargs["timeout"] = REQUEST_TIMEOUT
 
-    last_exc = None
+def _bu_guid(bu):
+    # BU GUID is the last segment of its self link
+    href = bu.get("_links", {}).get("self", {}).get("href", "")
+    return href.rstrip("/").rpartition("/")[2]
 
-    for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            return session.request(method, url, **kwargs)
-        except requests.RequestException as e:
-            last_exc = e
-            if attempt == MAX_RETRIES:
-                raise
-            print(f"[WARN] request failed on {url} (attempt {attempt})")
-            time.sleep(attempt)
 
-    raise last_exc or RuntimeError(f"max retries exceeded for {method} {url}")
+def _json(r):
+    # orjson decodes large paged responses much faster than stdlib json
+    return orjson.loads(r.content)
 
 
 def extract_bu_name(app_name):
     # first 4 letters before '-' define the BU name
-    match = re.match(r"^([A-Za-z]{4})-", app_name)
-    return match.group(1) if match else None
+    # (plain slicing, equivalent to ^([A-Za-z]{4})- without the regex)
+    prefix = app_name[:4]
+    if app_name[4:5] == "-" and prefix.isascii() and prefix.isalpha():
+        return prefix
+    return None
+
+
+def _cancel_tasks(tasks):
+    # cancel unfinished tasks and retrieve finished failures so none are
+    # reported as "exception was never retrieved"
+    for task in tasks:
+        if not task.cancel() and not task.cancelled():
+            task.exception()
+
+
+async def _get_page(client, url, page, key, size, sem):
+    # fetch one page and return (items, total_pages or None); shares the
+    # request cap with the app tasks
+    async with sem:
+        r = await send_request(
+            client,
+            "GET",
+            url,
+            params={"page": page, "size": size},
+        )
+    r.raise_for_status()
 
+    data = _json(r)
+    items = data.get(key) or data.get("_embedded", {}).get(key, [])
+    return items, (data.get("page") or {}).get("total_pages")
 
-def fetch_all_apps(session):
-    # pull all applications via simple paging
-    apps = []
-    page = 0
 
-    while True:
-        r = send_request(
-            session,
-            "GET",
-            APPS_URL,
-            params={"page": page, "size": PAGE_SIZE},
-        )
-        r.raise_for_status()
+async def fetch_pages(client, url, key, size, sem):
+    # first page reports total_pages, so the rest are fetched concurrently
+    # with no trailing empty-page request; chunks are yielded as they land
+    items, total = await _get_page(client, url, 0, key, size, sem)
+    yield items
 
-        chunk = r.json().get("_embedded", {}).get("applications", [])
-        if not chunk:
-            break
+    if total is not None:
+        tasks = [
+            asyncio.create_task(_get_page(client, url, page, key, size, sem))
+            for page in range(1, total)
+        ]
+        try:
+            for pending in asyncio.as_completed(tasks):
+                items, _ = await pending
+                yield items
+        finally:
+            # consumer stopped early or a page failed
+            _cancel_tasks(tasks)
+        return
 
-        apps.extend(chunk)
+    # no page metadata, fall back to paging until an empty chunk
+    page = 1
+    while items:
+        items, _ = await _get_page(client, url, page, key, size, sem)
+        yield items
         page += 1
 
-    return apps
 
+async def fetch_all_apps(client, sem):
+    # stream all applications as their pages arrive
+    pages = fetch_pages(client, APPS_URL, "applications", PAGE_SIZE, sem)
+    try:
+        async for chunk in pages:
+            for app in chunk:
+                yield app
+    finally:
+        # close now so pending page requests are cancelled with us
+        await pages.aclose()
 
-def fetch_business_units(session):
+
+async def fetch_business_units(client, sem):
     # fetch all BUs and map name -> guid
     result = {}
-    page = 0
 
-    while True:
-        r = send_request(
-            session,
-            "GET",
-            BU_URL,
-            params={"page": page, "size": PAGE_SIZE},
-        )
-        try:
-            r.raise_for_status()
-        except requests.HTTPError:
-            print("[ERROR] failed to fetch business units")
-            print("status:", r.status_code)
-            print("body:", r.text)
-            raise
+    try:
+        async for bu_list in fetch_pages(client, BU_URL, "business_units", BU_PAGE_SIZE, sem):
+            for bu in bu_list:
+                name = bu.get("bu_name")
+                guid = _bu_guid(bu)
+                if name and guid:
+                    result[name] = guid
+    except httpx.HTTPStatusError as e:
+        print("[ERROR] failed to fetch business units")
+        print("status:", e.response.status_code)
+        print("body:", e.response.text)
+        raise
 
-        data = r.json()
-        bu_list = data.get("business_units") or data.get("_embedded", {}).get("business_units", [])
+    return result
 
-        if not bu_list:
-            break
 
-        for bu in bu_list:
-            name = bu.get("bu_name")
-            href = bu.get("_links", {}).get("self", {}).get("href", "")
-            guid = href.rstrip("/").split("/")[-1]
-            if name and guid:
-                result[name] = guid
+def _read_cache(path):
+    # whole cache file, empty if missing, unreadable or not an object
+    try:
+        data = orjson.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def load_bu_cache(tenant):
+    # cached BU name -> guid map for this tenant, None if absent, stale or
+    # malformed
+    entry = _read_cache(BU_CACHE).get(tenant)
+    if not isinstance(entry, dict):
+        return None
+
+    saved_at = entry.get("saved_at")
+    bu_map = entry.get("bu_map")
+    if not isinstance(saved_at, (int, float)) or not isinstance(bu_map, dict):
+        return None
+    if time.time() - saved_at > BU_CACHE_TTL:
+        return None
+    return bu_map
+
+
+def save_bu_cache(tenant, bu_map):
+    # persist BU map so warm runs can skip the BU listing
+    data = _read_cache(BU_CACHE)
+    data[tenant] = {"saved_at": time.time(), "bu_map": bu_map}
+    try:
+        BU_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        BU_CACHE.write_bytes(orjson.dumps(data))
+    except OSError as e:
+        print(f"[WARN] could not write BU cache: {e}")
 
-        page += 1
 
-    return result
+def load_etag_cache(tenant):
+    # cached app guid -> {etag, bu_guid} for this tenant
+    entry = _read_cache(ETAG_CACHE).get(tenant)
+    return entry if isinstance(entry, dict) else {}
+
+
+def save_etag_cache(tenant, etags, app_guids):
+    # persist per-app ETags + BU projections for conditional GETs, dropping
+    # apps that no longer appear in the listing
+    data = _read_cache(ETAG_CACHE)
+    data[tenant] = {guid: entry for guid, entry in etags.items() if guid in app_guids}
+    try:
+        ETAG_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        ETAG_CACHE.write_bytes(orjson.dumps(data))
+    except OSError as e:
+        print(f"[WARN] could not write ETag cache: {e}")
 
 
-def create_business_unit(session, bu_name, dry_run=False):
+async def create_business_unit(client, bu_name, dry_run=False):
     # create BU if missing (or simulate)
     if dry_run:
         print(f"[DRY-RUN] create BU '{bu_name}'")
         return f"{bu_name}_DRYRUN"
 
-    r = send_request(session, "POST", BU_URL, json={"bu_name": bu_name})
+    r = await send_request(client, "POST", BU_URL, json={"bu_name": bu_name})
     r.raise_for_status()
 
-    href = r.json().get("_links", {}).get("self", {}).get("href", "")
-    bu_guid = href.rstrip("/").split("/")[-1]
+    bu_guid = _bu_guid(_json(r))
     print(f"[OK] created BU '{bu_name}'")
     return bu_guid
 
 
-def get_app_details(session, app_guid):
-    # retrieve full app profile before updating
+def _bulk_bu_guids(r):
+    # name -> guid from a bulk create response; tolerates an empty or
+    # unexpected body since the endpoint is undocumented
+    try:
+        data = _json(r) if r.content else {}
+    except ValueError:
+        return {}
+
+    if isinstance(data, list):
+        bu_list = data
+    elif isinstance(data, dict):
+        bu_list = data.get("business_units") or data.get("_embedded", {}).get("business_units", [])
+    else:
+        bu_list = []
+
+    return {
+        bu.get("bu_name"): _bu_guid(bu) for bu in bu_list if isinstance(bu, dict)
+    }
+
+
+async def _bulk_create_business_units(client, bu_names, sem):
+    # one POST for all names; returns the GUIDs it can confirm, and the
+    # caller creates the rest individually. anything short of a clear
+    # answer is checked against the listing so no BU is POSTed twice
+    payload = {"business_units": [{"bu_name": name} for name in bu_names]}
+    try:
+        r = await send_request(client, "POST", BU_BULK_URL, json=payload)
+    except httpx.TransportError as e:
+        print(f"[WARN] bulk BU create failed ({e!r}), checking BU list")
+        r = None
+
+    if r is not None and r.is_success:
+        result = _bulk_bu_guids(r)
+        missing = [name for name in bu_names if not result.get(name)]
+        if missing:
+            # the BUs were created but not echoed back; look them up
+            # instead of creating them again
+            listed = await fetch_business_units(client, sem)
+            result.update({name: listed[name] for name in missing if listed.get(name)})
+            missing = [name for name in bu_names if not result.get(name)]
+        if missing:
+            raise RuntimeError(
+                f"bulk BU create returned no GUID for: {', '.join(missing)}"
+            )
+        for name in bu_names:
+            print(f"[OK] created BU '{name}'")
+        return {name: result[name] for name in bu_names}
+
+    if r is not None:
+        if r.status_code in (401, 403):
+            r.raise_for_status()
+        # any other client error means the endpoint is absent or rejects
+        # the payload, so nothing was created
+        if r.is_client_error:
+            return {}
+        print(f"[WARN] bulk BU create returned {r.status_code}, checking BU list")
+
+    # 5xx / transport error: some BUs may exist now, keep those
+    listed = await fetch_business_units(client, sem)
+    result = {name: listed[name] for name in bu_names if listed.get(name)}
+    for name in result:
+        print(f"[OK] created BU '{name}'")
+    return result
+
+
+async def create_business_units(client, bu_names, sem, dry_run=False):
+    # create several BUs, in one round trip when BU_BULK_CREATE is on,
+    # otherwise (or for whatever bulk could not confirm) individually in
+    # parallel under the shared request cap; returns name -> guid
+    bu_names = sorted(bu_names)
+    if not bu_names:
+        return {}
+
+    result = {}
+    if BU_BULK_CREATE and not dry_run:
+        result = await _bulk_create_business_units(client, bu_names, sem)
+        bu_names = [name for name in bu_names if name not in result]
+
+    async def create_one(bu_name):
+        async with sem:
+            return await create_business_unit(client, bu_name, dry_run=dry_run)
+
+    guids = await asyncio.gather(*(create_one(name) for name in bu_names))
+    result.update(zip(bu_names, guids))
+    return result
+
+
+async def get_app_details(client, app_guid, etags=None):
+    # retrieve full app profile (fallback when the listing lacks it);
+    # returns (app, not_modified). with an etags cache the GET is
+    # conditional and a 304 yields only the cached BU projection
     url = f"{APPS_URL}/{app_guid}"
-    r = send_request(session, "GET", url)
+    cached = etags.get(app_guid) if etags is not None else None
+    if not isinstance(cached, dict) or not cached.get("etag"):
+        cached = None
+    headers = {"If-None-Match": cached["etag"]} if cached else {}
+
+    r = await send_request(client, "GET", url, headers=headers)
+    if r.status_code == 304 and cached:
+        bu_guid = cached.get("bu_guid")
+        bu = {"guid": bu_guid} if bu_guid else {}
+        return {"guid": app_guid, "profile": {"business_unit": bu}}, True
+
     r.raise_for_status()
-    return r.json()
+    app = _json(r)
+
+    etag = r.headers.get("ETag")
+    if etags is not None and etag:
+        bu_guid = (app.get("profile") or {}).get("business_unit", {}).get("guid")
+        etags[app_guid] = {"etag": etag, "bu_guid": bu_guid}
 
+    return app, False
 
-def update_app_business_unit(session, app_name, app_guid, full_app, bu_name, bu_guid, dry_run=False):
+
+async def update_app_business_unit(client, app_name, app_guid, full_app, bu_name, bu_guid, etags=None, dry_run=False):
     # patch app profile with correct BU assignment
-    profile = copy.deepcopy(full_app.get("profile", {}))
-    profile["business_unit"] = {"guid": bu_guid}
+    # shallow merge: the top-level dict is fresh so full_app is untouched
+    profile = {**(full_app.get("profile") or {}), "business_unit": {"guid": bu_guid}}
     payload = {"profile": profile}
 
     if dry_run:
@@ -147,117 +429,255 @@ def update_app_business_unit(session, app_name, app_guid, full_app, bu_name, bu_
         return
 
     url = f"{APPS_URL}/{app_guid}"
-    r = send_request(session, "PUT", url, json=payload)
+    r = await send_request(
+        client,
+        "PUT",
+        url,
+        content=orjson.dumps(payload),
+        headers={"Content-Type": "application/json"},
+    )
     r.raise_for_status()
     print(f"[OK] assigned '{app_name}' to BU '{bu_name}'")
 
-
-def write_dry_run_csv(rows):
-    # record all dry-run operations for review
-    if not rows:
-        print("[INFO] no rows to write")
-        return
-
-    fieldnames = [
-        "app_name",
-        "app_guid",
-        "bu_name",
-        "current_bu_guid",
-        "target_bu_guid",
-        "bu_action",
-        "app_action",
-    ]
-
-    with open(DEFAULT_CSV, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
-
-    print(f"[INFO] wrote CSV: {DEFAULT_CSV} ({len(rows)} rows)")
-
-
-def process_apps(dry_run=False):
-    session = build_session()
-
-    print("[INFO] loading BUs...")
-    bu_map = fetch_business_units(session)
-
-    print("[INFO] loading apps...")
-    apps = fetch_all_apps(session)
-    print(f"[INFO] found {len(apps)} apps")
-
-    csv_rows = []
-
-    # iterate each app and determine required BU action
-    for app in apps:
-        profile = app.get("profile") or {}
-        app_name = profile.get("name") or "<no-name>"
-        app_guid = app.get("guid")
-
-        # base CSV row
-        row = {
-            "app_name": app_name,
-            "app_guid": app_guid or "",
-            "bu_name": "",
-            "current_bu_guid": "",
-            "target_bu_guid": "",
-            "bu_action": "",
-            "app_action": "",
-        }
-
-        if not app_guid:
-            print(f"[SKIP] '{app_name}' (no GUID)")
-            if dry_run:
-                row["app_action"] = "skip_no_guid"
-                csv_rows.append(row)
-            continue
-
-        # extract BU prefix from naming convention
-        bu_name = extract_bu_name(app_name)
-        row["bu_name"] = bu_name or ""
-
-        if not bu_name:
-            print(f"[SKIP] '{app_name}' (unsupported name)")
-            if dry_run:
-                row["app_action"] = "skip_name_format"
-                csv_rows.append(row)
-            continue
-
-        # resolve (or create) BU GUID
-        if bu_name in bu_map:
-            bu_guid = bu_map[bu_name]
-            bu_action = "existing"
+    # keep a cached ETag entry in step with the new assignment, or drop it
+    # so the next run does a full GET
+    if etags is not None and app_guid in etags:
+        etag = r.headers.get("ETag")
+        if etag:
+            etags[app_guid] = {"etag": etag, "bu_guid": bu_guid}
         else:
-            bu_guid = create_business_unit(session, bu_name, dry_run=dry_run)
-            bu_map[bu_name] = bu_guid
-            bu_action = "create_dryrun" if dry_run else "create"
+            del etags[app_guid]
 
-        # fetch current BU assignment
-        full = get_app_details(session, app_guid)
-        current_guid = full.get("profile", {}).get("business_unit", {}).get("guid")
 
-        row["current_bu_guid"] = current_guid or ""
-        row["target_bu_guid"] = bu_guid or ""
+@contextmanager
+def dry_run_csv(enabled):
+    # stream dry-run operations to disk as they are produced; yields a
+    # row writer (or None when not in dry-run mode)
+    if not enabled:
+        yield None
+        return
+
+    count = 0
+
+    # large buffer keeps write syscalls down on big reports
+    with open(DEFAULT_CSV, "w", newline="", encoding="utf-8", buffering=CSV_BUFFER) as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS)
+
+        def emit(row):
+            # called from the event loop thread only, so no lock needed
+            nonlocal count
+            writer.writerow(row)
+            count += 1
+
+        yield emit
+
+    print(f"[INFO] wrote CSV: {DEFAULT_CSV} ({count} rows)")
+
+
+async def _process_one(client, sem, app, bu_name, bu_map, created, etags, dry_run=False):
+    # determine and apply the BU action for a single app, returns CSV row
+    # as a tuple in CSV_FIELDS order
+    profile = app.get("profile") or {}
+    app_name = profile.get("name") or "<no-name>"
+    app_guid = app.get("guid")
+
+    if not app_guid:
+        print(f"[SKIP] '{app_name}' (no GUID)")
+        return (app_name, "", "", "", "", "", "skip_no_guid")
+
+    if not bu_name:
+        print(f"[SKIP] '{app_name}' (unsupported name)")
+        return (app_name, app_guid, "", "", "", "", "skip_name_format")
+
+    # BUs were resolved up front, so bu_map is read-only here. only the
+    # first app of a newly created BU reports the create, later ones see
+    # it as existing (checked before any await, so no race)
+    bu_guid = bu_map[bu_name]
+    if bu_name in created:
+        created.discard(bu_name)
+        bu_action = "create_dryrun" if dry_run else "create"
+    else:
+        bu_action = "existing"
+
+    # cap in-flight requests across all app tasks
+    async with sem:
+        # the paged listing already embeds the profile; only re-fetch when
+        # it is missing the BU assignment
+        full, not_modified = app, False
+        if "business_unit" not in profile:
+            full, not_modified = await get_app_details(client, app_guid, etags)
+        current_guid = (full.get("profile") or {}).get("business_unit", {}).get("guid")
 
-        # fetch current BU assignment
         if current_guid == bu_guid:
             print(f"[SKIP] '{app_name}' already in '{bu_name}'")
             app_action = "already_in_bu"
         else:
+            # a 304 projection can't be PUT back, fetch the full profile
+            if not_modified:
+                full, _ = await get_app_details(client, app_guid)
+
             # perform or simulate assignment
-            update_app_business_unit(
-                session, app_name, app_guid, full, bu_name, bu_guid, dry_run=dry_run
+            await update_app_business_unit(
+                client, app_name, app_guid, full, bu_name, bu_guid, etags, dry_run=dry_run
             )
             app_action = "assign_dryrun" if dry_run else "assign"
 
-        if dry_run:
-            row["bu_action"] = bu_action
-            row["app_action"] = app_action
-            csv_rows.append(row)
+    return (
+        app_name,
+        app_guid,
+        bu_name,
+        current_guid or "",
+        bu_guid or "",
+        bu_action,
+        app_action,
+    )
 
-    # write full dry-run report after processing
-    if dry_run:
-        write_dry_run_csv(csv_rows)
+
+async def process_apps(dry_run=False, use_cache=True):
+    async with build_client() as client:
+        # cache is keyed by API key id as a stand-in for the tenant
+        tenant = client.auth.api_key_id
+        # caps in-flight requests across page fetches and app tasks
+        sem = asyncio.Semaphore(MAX_CONCURRENCY)
+
+        async def load_bu_map():
+            print("[INFO] loading BUs...")
+            result = await fetch_business_units(client, sem)
+            if use_cache:
+                save_bu_cache(tenant, result)
+            return result
+
+        # stale GUIDs only surface as a 404 on the PUT, which a dry run never
+        # sends, so the report is always planned against a fresh listing
+        bu_map = load_bu_cache(tenant) if use_cache and not dry_run else None
+        from_cache = bu_map is not None
+        if from_cache:
+            print(f"[INFO] using cached BUs ({BU_CACHE})")
+        else:
+            bu_map = await load_bu_map()
+
+        etags = load_etag_cache(tenant) if use_cache else None
+        app_guids = set()
+        # names created this run (first-row "create" report flag only)
+        created = set()
+        # name -> guid of every BU created this run, and the in-flight
+        # create task per name, so each BU is POSTed at most once
+        new_guids = {}
+        creates = {}
+        refresh = None
+
+        async def reload_bu_map():
+            # replace rather than merge so deleted BUs drop out of the map,
+            # keeping anything created this run in case the listing predates it
+            print("[INFO] refreshing cached BUs...")
+            fresh = await load_bu_map()
+            bu_map.clear()
+            bu_map.update(fresh)
+            bu_map.update(new_guids)
+
+        async def refresh_cached_bus():
+            # single-flight: every path that suspects a stale cache shares
+            # one refetch per run
+            nonlocal refresh
+            if refresh is None:
+                refresh = asyncio.create_task(reload_bu_map())
+            await refresh
+
+        async def create_bus(bu_names):
+            guids = await create_business_units(client, bu_names, sem, dry_run=dry_run)
+            new_guids.update(guids)
+            bu_map.update(guids)
+            created.update(bu_names)
+            if use_cache and not dry_run:
+                save_bu_cache(tenant, bu_map)
+
+        async def ensure_bus(bu_names):
+            # create whichever of bu_names are still missing, joining any
+            # create already in flight for a name instead of POSTing again
+            to_create = sorted(
+                name for name in bu_names if name not in bu_map and name not in creates
+            )
+            if to_create:
+                task = asyncio.create_task(create_bus(to_create))
+                for name in to_create:
+                    creates[name] = task
+            await asyncio.gather(*{creates[name] for name in bu_names if name in creates})
+
+        async def refresh_bu_map(bu_name):
+            # a 404 on update may mean a cached GUID went stale; refetch
+            # once for all tasks, then recreate the BU if it was deleted
+            await refresh_cached_bus()
+            await ensure_bus([bu_name])
+
+        # per-app work is I/O bound, overlap the round trips; dry-run rows
+        # are written as each app finishes
+        with dry_run_csv(dry_run) as emit:
+            async def run(app, bu_name):
+                # a cache refresh may have dropped this app's BU since it was
+                # scheduled; refetch / recreate it rather than failing
+                if app.get("guid") and bu_name and bu_name not in bu_map:
+                    await refresh_bu_map(bu_name)
+                try:
+                    row = await _process_one(
+                        client, sem, app, bu_name, bu_map, created, etags, dry_run=dry_run
+                    )
+                except httpx.HTTPStatusError as e:
+                    # only the PUT carries the BU GUID; a 404 on the app GET
+                    # means the app itself is gone
+                    stale = e.response.status_code == 404 and e.request.method == "PUT"
+                    if not from_cache or not stale:
+                        raise
+                    await refresh_bu_map(bu_name)
+                    row = await _process_one(
+                        client, sem, app, bu_name, bu_map, created, etags, dry_run=dry_run
+                    )
+                if emit:
+                    emit(row)
+
+            # apps whose BU already exists start while later pages are still
+            # loading; the rest wait until missing BUs have been created.
+            # every app stays referenced by its pending task or by deferred
+            # until processed, so this overlaps paging with work but does
+            # not bound memory to a page
+            print("[INFO] loading apps...")
+            tasks = []
+            deferred = []
+            app_count = 0
+
+            apps = fetch_all_apps(client, sem)
+            try:
+                async for app in apps:
+                    app_count += 1
+                    if app.get("guid"):
+                        app_guids.add(app["guid"])
+                    # extract BU prefix from naming convention once per app
+                    bu_name = extract_bu_name((app.get("profile") or {}).get("name") or "")
+                    if bu_name and app.get("guid") and bu_name not in bu_map:
+                        deferred.append((app, bu_name))
+                    else:
+                        tasks.append(asyncio.create_task(run(app, bu_name)))
+
+                print(f"[INFO] found {app_count} apps")
+
+                needed = {bu_name for _, bu_name in deferred}
+
+                # a name missing from the cache may just be stale, refresh first
+                if from_cache and needed:
+                    await refresh_cached_bus()
+
+                # create missing BUs before their apps run so each is created once
+                await ensure_bus(needed)
+
+                tasks.extend(asyncio.create_task(run(app, bu_name)) for app, bu_name in deferred)
+                await asyncio.gather(*tasks)
+            finally:
+                # on failure, stop outstanding page fetches and app tasks
+                await apps.aclose()
+                _cancel_tasks(tasks)
+
+        if etags is not None:
+            save_etag_cache(tenant, etags, app_guids)
 
 
 def main():
@@ -265,10 +685,15 @@ def main():
         description="Assign apps to BUs by first 4 letters (AAAA-) naming convention."
     )
     parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="ignore the local BU and app ETag caches and always query the API",
+    )
     args = parser.parse_args()
 
     try:
-        process_apps(dry_run=args.dry_run)
+        asyncio.run(process_apps(dry_run=args.dry_run, use_cache=not args.no_cache))
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
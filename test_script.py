@@ -0,0 +1,256 @@
+import asyncio
+import csv
+import json
+import time
+from collections import Counter
+
+import httpx
+import orjson
+import pytest
+
+from veracode_api_signing import veracode_hmac_auth
+from veracode_api_signing.exceptions import VeracodeCredentialsError
+
+import script
+
+API_KEY_ID = "0123456789abcdef0123456789abcdef"
+API_KEY_SECRET = "0123456789abcdef" * 8
+
+
+class FakeVeracode:
+    # minimal in-memory stand-in for the applications + identity APIs
+
+    def __init__(self, bus, pages, page_delay=0.0, create_delay=0.0, bulk=None):
+        self.bus = dict(bus)
+        self.bulk = bulk
+        self.bulk_calls = 0
+        self.pages = pages
+        self.page_delay = page_delay
+        self.create_delay = create_delay
+        self.created = Counter()
+        self.puts = []
+
+    def _bu(self, name, guid):
+        return {"bu_name": name, "_links": {"self": {"href": f"{script.BU_URL}/{guid}"}}}
+
+    async def handler(self, request):
+        path = request.url.path
+        if path.endswith("/business_units/bulk"):
+            self.bulk_calls += 1
+            return self.bulk(self, request) if self.bulk else httpx.Response(404)
+        if path.endswith("/business_units") and request.method == "GET":
+            bus = [self._bu(name, guid) for name, guid in self.bus.items()]
+            return httpx.Response(
+                200, json={"_embedded": {"business_units": bus}, "page": {"total_pages": 1}}
+            )
+        if path.endswith("/business_units") and request.method == "POST":
+            name = json.loads(request.content)["bu_name"]
+            await asyncio.sleep(self.create_delay)
+            self.created[name] += 1
+            guid = f"new-{name}-{sum(self.created.values())}"
+            self.bus[name] = guid
+            return httpx.Response(201, json=self._bu(name, guid))
+        if path.endswith("/applications") and request.method == "GET":
+            page = int(request.url.params["page"])
+            # later pages lag so early app tasks run while paging continues
+            if page:
+                await asyncio.sleep(self.page_delay)
+            return httpx.Response(
+                200,
+                json={
+                    "_embedded": {"applications": self.pages[page]},
+                    "page": {"total_pages": len(self.pages)},
+                },
+            )
+        if request.method == "PUT":
+            bu_guid = json.loads(request.content)["profile"]["business_unit"]["guid"]
+            if bu_guid not in self.bus.values():
+                return httpx.Response(404)
+            self.puts.append((path.rsplit("/", 1)[-1], bu_guid))
+            return httpx.Response(200, json={})
+        return httpx.Response(500)
+
+
+def _app(guid, name):
+    return {"guid": guid, "profile": {"name": name, "business_unit": {}}}
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    monkeypatch.setenv("VERACODE_API_KEY_ID", API_KEY_ID)
+    monkeypatch.setenv("VERACODE_API_KEY_SECRET", API_KEY_SECRET)
+    monkeypatch.setattr(script, "BU_CACHE", tmp_path / "bu_map.json")
+    monkeypatch.setattr(script, "ETAG_CACHE", tmp_path / "app_etags.json")
+
+    def install(server):
+        monkeypatch.setattr(
+            script,
+            "build_client",
+            lambda: httpx.AsyncClient(
+                auth=script.VeracodeHMACAuth(),
+                transport=httpx.MockTransport(server.handler),
+            ),
+        )
+        return server
+
+    return install
+
+
+def test_stale_cache_creates_each_bu_once(api, tmp_path):
+    # ABCD was deleted server-side, EFGH still exists; IJKL is new. a1 hits
+    # the stale ABCD GUID (404) and starts recreating it; page 1 lands while
+    # that POST is still in flight, so a2 is deferred next to IJKL and must
+    # join the pending create rather than POST ABCD a second time
+    server = api(
+        FakeVeracode(
+            {"EFGH": "efgh-guid"},
+            [
+                [_app("a1", "ABCD-one"), _app("e1", "EFGH-one")],
+                [_app("a2", "ABCD-two"), _app("i1", "IJKL-one")],
+            ],
+            page_delay=0.05,
+            create_delay=0.1,
+        )
+    )
+    script.save_bu_cache(API_KEY_ID, {"ABCD": "stale-abcd", "EFGH": "stale-efgh"})
+
+    asyncio.run(script.process_apps())
+
+    assert server.created == Counter({"ABCD": 1, "IJKL": 1})
+    assert sorted(server.puts) == [
+        ("a1", server.bus["ABCD"]),
+        ("a2", server.bus["ABCD"]),
+        ("e1", "efgh-guid"),
+        ("i1", server.bus["IJKL"]),
+    ]
+    assert script.load_bu_cache(API_KEY_ID) == server.bus
+
+
+def test_dry_run_ignores_stale_cache(api, tmp_path, monkeypatch):
+    # a cached GUID for a deleted BU must not be reported as "existing"
+    server = api(FakeVeracode({}, [[_app("a1", "ABCD-one")]]))
+    script.save_bu_cache(API_KEY_ID, {"ABCD": "stale-abcd"})
+    monkeypatch.chdir(tmp_path)
+
+    asyncio.run(script.process_apps(dry_run=True))
+
+    with open(script.DEFAULT_CSV, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [(r["bu_name"], r["bu_action"], r["app_action"]) for r in rows] == [
+        ("ABCD", "create_dryrun", "assign_dryrun")
+    ]
+    assert not server.created and not server.puts
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [
+        [],
+        "oops",
+        {"saved_at": "yesterday", "bu_map": {}},
+        {"saved_at": time.time(), "bu_map": ["ABCD"]},
+        {"bu_map": {}},
+    ],
+)
+def test_malformed_bu_cache_entry_is_a_miss(api, entry):
+    script.BU_CACHE.write_bytes(orjson.dumps({API_KEY_ID: entry}))
+    assert script.load_bu_cache(API_KEY_ID) is None
+
+
+@pytest.mark.parametrize("prefix", ["", "vera01ei-"])
+@pytest.mark.parametrize(
+    "host, path, method",
+    [
+        ("api.veracode.com", "/appsec/v1/applications?page=0&size=500", "GET"),
+        ("API.Veracode.com", "/appsec/v1/applications/abc", "put"),
+        ("api.veracode.eu", "/api/authn/v2/business_units", "POST"),
+    ],
+)
+def test_hmac_header_matches_upstream(monkeypatch, prefix, host, path, method):
+    monkeypatch.setenv("VERACODE_API_KEY_ID", prefix + API_KEY_ID)
+    monkeypatch.setenv("VERACODE_API_KEY_SECRET", prefix + API_KEY_SECRET)
+    # pin nonce + timestamp in both signers
+    for module in (script, veracode_hmac_auth):
+        monkeypatch.setattr(module, "get_current_timestamp", lambda: 1445452792746)
+        monkeypatch.setattr(module, "generate_nonce", lambda: "3b1974fbaa7c97cc3b1974fbaa7c97cc")
+
+    auth = script.VeracodeHMACAuth()
+    expected = veracode_hmac_auth.generate_veracode_hmac_header(
+        host, path, method, prefix + API_KEY_ID, prefix + API_KEY_SECRET
+    )
+    assert auth.sign(host, path, method) == expected
+
+    # reusing the seeded key must not carry state between requests
+    assert auth.sign(host, path, method) == expected
+
+
+def test_hmac_auth_signs_path_with_query(monkeypatch):
+    monkeypatch.setenv("VERACODE_API_KEY_ID", API_KEY_ID)
+    monkeypatch.setenv("VERACODE_API_KEY_SECRET", API_KEY_SECRET)
+    signed = []
+    monkeypatch.setattr(
+        script.VeracodeHMACAuth, "sign", lambda self, *args: signed.append(args) or "sig"
+    )
+
+    request = httpx.Request("GET", script.APPS_URL, params={"page": 0, "size": 500})
+    next(script.VeracodeHMACAuth().auth_flow(request))
+
+    assert signed == [("api.veracode.com", "/appsec/v1/applications?page=0&size=500", "GET")]
+    assert request.headers["Authorization"] == "sig"
+
+
+def test_hmac_auth_rejects_invalid_credentials(monkeypatch):
+    monkeypatch.setenv("VERACODE_API_KEY_ID", "short")
+    monkeypatch.setenv("VERACODE_API_KEY_SECRET", API_KEY_SECRET)
+    with pytest.raises(VeracodeCredentialsError):
+        script.VeracodeHMACAuth()
+
+
+def _bulk_creates_first_then_fails(server, request):
+    # server applies part of the batch, then the gateway reports an error
+    name = json.loads(request.content)["business_units"][0]["bu_name"]
+    server.bus[name] = f"bulk-{name}"
+    return httpx.Response(500)
+
+
+def test_bulk_create_is_off_by_default(api):
+    server = api(FakeVeracode({}, [[_app("a1", "ABCD-one")]]))
+
+    asyncio.run(script.process_apps(use_cache=False))
+
+    assert server.bulk_calls == 0
+    assert server.created == Counter({"ABCD": 1})
+
+
+def test_bulk_create_5xx_keeps_created_and_falls_back(api, monkeypatch):
+    monkeypatch.setattr(script, "BU_BULK_CREATE", True)
+    server = api(
+        FakeVeracode(
+            {},
+            [[_app("a1", "ABCD-one"), _app("i1", "IJKL-one")]],
+            bulk=_bulk_creates_first_then_fails,
+        )
+    )
+
+    asyncio.run(script.process_apps(use_cache=False))
+
+    # ABCD came from the failed bulk call and must not be POSTed again
+    assert server.bulk_calls == 1
+    assert server.created == Counter({"IJKL": 1})
+    assert sorted(server.puts) == [("a1", "bulk-ABCD"), ("i1", server.bus["IJKL"])]
+
+
+def test_bulk_create_4xx_falls_back(api, monkeypatch):
+    monkeypatch.setattr(script, "BU_BULK_CREATE", True)
+    server = api(
+        FakeVeracode(
+            {},
+            [[_app("a1", "ABCD-one")]],
+            bulk=lambda server, request: httpx.Response(400),
+        )
+    )
+
+    asyncio.run(script.process_apps(use_cache=False))
+
+    assert server.bulk_calls == 1
+    assert server.created == Counter({"ABCD": 1})